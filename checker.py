@@ -1,22 +1,29 @@
 import re
 import json
-import base64
+import orjson
+import binascii
 import urllib.parse
-import subprocess
 import os
+import tempfile
+import sys
 import time
-import requests
 import asyncio
 import aiohttp
+from aiohttp_socks import ProxyConnector, ProxyError, ProxyConnectionError, ProxyTimeoutError
 import argparse
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Set, TextIO, Tuple
 from dataclasses import dataclass, asdict
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import unquote_plus
 from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
 import ipaddress
 
-@dataclass
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+@dataclass(slots=True)
 class ConfigData:
     type: str
     name: str = ""
@@ -42,158 +49,198 @@ class ConfigData:
     pbk: str = ""
     sid: str = ""
 
+def _b64(data: str) -> bytes:
+    """Decode base64, padding it only if the unpadded form is rejected"""
+    try:
+        return binascii.a2b_base64(data)
+    except binascii.Error:
+        return binascii.a2b_base64(data + "=" * (-len(data) % 4))
+
 def decode_vmess_base64(vmess_str: str) -> Dict:
-    if vmess_str.startswith("vmess://"):
-        vmess_str = vmess_str[8:]
-    
     try:
-        decoded = base64.b64decode(vmess_str + "=" * (-len(vmess_str) % 4))
+        decoded = _b64(vmess_str)
         return json.loads(decoded)
     except:
         return {}
 
-def parse_vless(url: str) -> ConfigData:
-    url = url.replace("vless://", "")
+def _check_port(port: int) -> int:
+    """Reject ports outside 0-65535, as urlparse().port did"""
+    if not 0 <= port <= 65535:
+        raise ValueError("Port out of range 0-65535")
+    return port
+
+def _parse_simple(server_info: str) -> Tuple[str, int, Dict[str, str]]:
+    """Split "host:port/?key=value&...#name" into host, port and a single-value query dict"""
+    server_info = server_info.partition("#")[0]
+    netloc, _, query = server_info.partition("?")
+    netloc = netloc.partition("/")[0]
+    
+    if netloc.startswith("["):
+        # IPv6 literal, e.g. [2001:db8::1]:443
+        host, _, port = netloc[1:].partition("]")
+        port = port[1:]
+    elif ":" in netloc:
+        host, _, port = netloc.rpartition(":")
+    else:
+        host, port = netloc, ""
     
+    # Like parse_qs: skip blank values, keep the first of repeated keys
+    params = {}
+    for part in query.split("&"):
+        key, _, value = part.partition("=")
+        if value and key not in params:
+            params[key] = unquote_plus(value) if "%" in value or "+" in value else value
+    
+    return host.lower(), _check_port(int(port)) if port else 443, params
+
+# (query/JSON key, ConfigData attribute) pairs copied verbatim by the parsers
+_VLESS_FIELDS = (
+    ("type", "network"),
+    ("path", "path"),
+    ("security", "security"),
+    ("encryption", "encryption"),
+    ("host", "host"),
+    ("sni", "sni"),
+    ("fp", "fp"),
+    ("alpn", "alpn"),
+    ("flow", "flow"),
+    ("headerType", "headerType"),
+    ("serviceName", "grpc_service_name"),
+    ("pbk", "pbk"),
+    ("sid", "sid"),
+)
+
+_TROJAN_FIELDS = (
+    ("type", "network"),
+    ("path", "path"),
+    ("security", "security"),
+    ("sni", "sni"),
+    ("headerType", "headerType"),
+)
+
+_VMESS_FIELDS = (
+    ("add", "server"),
+    ("id", "uuid"),
+    ("net", "network"),
+    ("path", "path"),
+    ("host", "host"),
+    ("type", "headerType"),
+)
+
+def parse_vless(url: str) -> ConfigData:
     if "@" in url:
         user_info, server_info = url.split("@", 1)
     else:
         return ConfigData(type="vless")
     
-    parsed = urlparse(f"https://{server_info}")
-    params = parse_qs(parsed.query)
+    host, port, params = _parse_simple(server_info)
     
     config = ConfigData(type="vless")
     config.uuid = user_info
-    config.server = parsed.hostname or ""
-    config.port = int(parsed.port or 443)
+    config.server = host
+    config.port = port
     
-    if "type" in params:
-        config.network = params["type"][0]
-    if "path" in params:
-        config.path = params["path"][0]
-    if "security" in params:
-        config.security = params["security"][0]
-    if "encryption" in params:
-        config.encryption = params["encryption"][0]
-    if "host" in params:
-        config.host = params["host"][0]
-    if "sni" in params:
-        config.sni = params["sni"][0]
-    if "fp" in params:
-        config.fp = params["fp"][0]
-    if "alpn" in params:
-        config.alpn = params["alpn"][0]
-    if "flow" in params:
-        config.flow = params["flow"][0]
-    if "headerType" in params:
-        config.headerType = params["headerType"][0]
+    for key, attr in _VLESS_FIELDS:
+        value = params.get(key)
+        if value:
+            setattr(config, attr, value)
     if "xtls" in params:
-        config.xtls = params["xtls"][0].lower() == "true"
-    if "serviceName" in params:
-        config.grpc_service_name = params["serviceName"][0]
-    if "pbk" in params:
-        config.pbk = params["pbk"][0]
-    if "sid" in params:
-        config.sid = params["sid"][0]
+        config.xtls = params["xtls"].lower() == "true"
     
     return config
 
 def parse_vmess(url: str) -> ConfigData:
-    if not url.startswith("vmess://"):
-        return ConfigData(type="vmess")
-    
     vmess_data = decode_vmess_base64(url)
     
     config = ConfigData(type="vmess")
-    config.server = vmess_data.get("add", "")
-    config.port = int(vmess_data.get("port", 443))
-    config.uuid = vmess_data.get("id", "")
+    for key, attr in _VMESS_FIELDS:
+        if key in vmess_data:
+            setattr(config, attr, vmess_data[key])
+    config.port = _check_port(int(vmess_data.get("port", 443)))
     config.aid = int(vmess_data.get("aid", 0))
-    config.network = vmess_data.get("net", "tcp")
-    config.path = vmess_data.get("path", "/")
-    config.host = vmess_data.get("host", "")
     config.tls = "tls" if vmess_data.get("tls") == "tls" else "none"
-    config.headerType = vmess_data.get("type", "")
     
     return config
 
 def parse_trojan(url: str) -> ConfigData:
-    if not url.startswith("trojan://"):
-        return ConfigData(type="trojan")
-    
-    url = url.replace("trojan://", "")
-    
     if "@" in url:
         password, server_info = url.split("@", 1)
     else:
         return ConfigData(type="trojan")
     
-    parsed = urlparse(f"https://{server_info}")
-    params = parse_qs(parsed.query)
+    host, port, params = _parse_simple(server_info)
     
     config = ConfigData(type="trojan")
     config.password = password
-    config.server = parsed.hostname or ""
-    config.port = int(parsed.port or 443)
+    config.server = host
+    config.port = port
     
-    if "type" in params:
-        config.network = params["type"][0]
-    if "path" in params:
-        config.path = params["path"][0]
-    if "security" in params:
-        config.security = params["security"][0]
-    if "sni" in params:
-        config.sni = params["sni"][0]
-    if "headerType" in params:
-        config.headerType = params["headerType"][0]
+    for key, attr in _TROJAN_FIELDS:
+        value = params.get(key)
+        if value:
+            setattr(config, attr, value)
     
     return config
 
 def parse_shadowsocks(url: str) -> ConfigData:
-    if not url.startswith("ss://"):
-        return ConfigData(type="shadowsocks")
-    
-    url = url.replace("ss://", "")
-    
     try:
         if "@" in url:
             user_info, server_info = url.split("@", 1)
-            decoded = base64.b64decode(user_info + "=" * (-len(user_info) % 4)).decode()
+            decoded = _b64(user_info).decode()
             method, password = decoded.split(":", 1)
         else:
-            decoded = base64.b64decode(url + "=" * (-len(url) % 4)).decode()
+            decoded = _b64(url).decode()
             method, rest = decoded.split(":", 1)
             password, server_info = rest.split("@", 1)
             
-        parsed = urlparse(f"https://{server_info}")
+        host, port, _ = _parse_simple(server_info)
         
         config = ConfigData(type="shadowsocks")
         config.method = method
         config.password = password
-        config.server = parsed.hostname or ""
-        config.port = int(parsed.port or 443)
+        config.server = host
+        config.port = port
         
         return config
     except:
         return ConfigData(type="shadowsocks")
 
-def config_to_json(config_url: str, inbound_port: int = 1080, output_filename: str = "config_output.json") -> Dict:
+# Parsers receive the URL with its "scheme://" prefix already stripped
+PARSERS = {
+    "vless": parse_vless,
+    "vmess": parse_vmess,
+    "trojan": parse_trojan,
+    "ss": parse_shadowsocks,
+}
+
+def parse_config(config_url: str) -> Optional[ConfigData]:
+    """Parse a config URL into ConfigData, or None if its scheme is unsupported"""
+    scheme, _, tail = config_url.partition("://")
+    parser = PARSERS.get(scheme)
+    if parser is None:
+        return None
+    return parser(tail)
+
+# Fixed request headers for tcp + headerType=http obfuscation; shared, never mutated
+_TCP_HTTP_HEADERS = {
+    "User-Agent": [
+        "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/53.0.2785.143 Safari/537.36",
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 10_0_2 like Mac OS X) AppleWebKit/601.1 (KHTML, like Gecko) CriOS/53.0.2785.109 Mobile/14A456 Safari/601.1.46"
+    ],
+    "Accept-Encoding": ["gzip, deflate"],
+    "Connection": ["keep-alive"],
+    "Pragma": "no-cache"
+}
+
+def config_to_json(config_url: str, inbound_port: int = 1080) -> Dict:
     """Convert various config formats to Xray JSON format
     
     Args:
         config_url: The config URL string
         inbound_port: The port number for inbound SOCKS connection
     """
-    if config_url.startswith("vless://"):
-        config = parse_vless(config_url)
-    elif config_url.startswith("vmess://"):
-        config = parse_vmess(config_url)
-    elif config_url.startswith("trojan://"):
-        config = parse_trojan(config_url)
-    elif config_url.startswith("ss://"):
-        config = parse_shadowsocks(config_url)
-    else:
+    config = parse_config(config_url)
+    if config is None:
         return {"error": "Unsupported config format"}
     
     xray_config = {
@@ -246,13 +293,7 @@ def config_to_json(config_url: str, inbound_port: int = 1080, output_filename: s
                     "path": [config.path] if config.path else ["/"],
                     "headers": {
                         "Host": [config.host] if config.host else [],
-                        "User-Agent": [
-                            "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/53.0.2785.143 Safari/537.36",
-                            "Mozilla/5.0 (iPhone; CPU iPhone OS 10_0_2 like Mac OS X) AppleWebKit/601.1 (KHTML, like Gecko) CriOS/53.0.2785.109 Mobile/14A456 Safari/601.1.46"
-                        ],
-                        "Accept-Encoding": ["gzip, deflate"],
-                        "Connection": ["keep-alive"],
-                        "Pragma": "no-cache"
+                        **_TCP_HTTP_HEADERS
                     }
                 }
             }
@@ -314,182 +355,317 @@ def config_to_json(config_url: str, inbound_port: int = 1080, output_filename: s
             "password": config.password
         }]
     
-       # Save to output JSON file
-    with open(output_filename, 'w') as f:
-        json.dump(xray_config, f, indent=2)
-    
     return xray_config
 
-def fetch_subscription(url: str) -> List[str]:
-    """Fetch and decode subscription link content"""
+def xray_slot(config: Dict) -> Tuple[bytes, bytes, bytes]:
+    """Serialize a config's inbound, outbound and routing rule, tagged by its SOCKS port"""
+    port = config["inbounds"][0]["port"]
+    inbound = dict(config["inbounds"][0], tag=f"in{port}")
+    outbound = dict(config["outbounds"][0], tag=f"out{port}")
+    rule = {"type": "field", "inboundTag": [inbound["tag"]], "outboundTag": outbound["tag"]}
+    return orjson.dumps(inbound), orjson.dumps(outbound), orjson.dumps(rule)
+
+def merge_xray_slots(slots: List[Tuple[bytes, bytes, bytes]]) -> bytes:
+    """Join serialized slots into one Xray config that routes each inbound to its own outbound"""
+    inbounds, outbounds, rules = zip(*slots)
+    return (b'{"inbounds":[' + b",".join(inbounds)
+            + b'],"outbounds":[' + b",".join(outbounds)
+            + b'],"routing":{"rules":[' + b",".join(rules) + b"]}}")
+
+async def fetch_subscription(url: str, session: aiohttp.ClientSession) -> AsyncIterator[str]:
+    """Fetch and decode subscription link content, yielding one config per line"""
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        content = response.text.strip()
-        
-        # Try base64 decoding if content looks encoded
-        try:
-            decoded = base64.b64decode(content + "=" * (-len(content) % 4)).decode()
-            configs = decoded.splitlines()
-        except:
-            configs = content.splitlines()
-            
-        return [line.strip() for line in configs if line.strip()]
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            response.raise_for_status()
+            content = (await response.text()).strip()
     except Exception as e:
         print(f"Error fetching subscription: {str(e)}")
-        return []
+        return
+    
+    # Try base64 decoding if content looks encoded
+    try:
+        content = _b64(content).decode()
+    except ValueError:
+        # binascii.Error, UnicodeDecodeError or non-ASCII input: treat as plain text
+        pass
+    
+    for line in content.splitlines():
+        line = line.strip()
+        if line:
+            yield line
+
+def load_working_configs(filename: str = "working_configs.txt") -> Set[str]:
+    """Load previously saved working configs into a set"""
+    if not os.path.exists(filename):
+        return set()
+    with open(filename, "r") as f:
+        return set(f.read().splitlines())
 
-def save_working_config(config: str, filename: str = "working_configs.txt"):
-    """Save a single working config to file if it doesn't already exist"""
+def save_working_config(config: str, existing: Set[str], save_file: TextIO):
+    """Append a single working config to save_file if it isn't already in existing"""
+    # No awaits in here, so the check-and-append can't interleave with other tests
     try:
-        # Check if file exists
-        existing_configs = set()
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                existing_configs = set(line.strip() for line in f)
-        
         # Check if config already exists
-        if config in existing_configs:
-            print(f"\033[93m[SKIP]\033[0m Config already exists in {filename}")
+        if config in existing:
+            print(f"\033[93m[SKIP]\033[0m Config already exists in {save_file.name}")
             return
         
         # If config is new, append it to file
-        with open(filename, "a") as f:
-            f.write(f"{config}\n")
-        print(f"\033[92m[SAVED]\033[0m Config saved to {filename}")
+        save_file.write(f"{config}\n")
+        existing.add(config)
+        print(f"\033[92m[SAVED]\033[0m Config saved to {save_file.name}")
     except Exception as e:
         print(f"\033[91mError saving config: {str(e)}\033[0m")
 
-async def test_config(config_url: str, port: int) -> Dict:
-    """Test a single config using specified port"""
-    process = None
-    process_curl = None
-    temp_filename = None
-    
+_OCTET = r"(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])"
+_IPV4 = re.compile(rf"(?:{_OCTET}\.){{3}}{_OCTET}").fullmatch
+
+def _is_ip(text: str) -> bool:
+    """Check for a valid IP address, only building an ipaddress object for IPv6"""
+    if _IPV4(text):
+        return True
+    if ":" not in text:
+        return False
     try:
-        # Convert config to Xray JSON format
-        config = config_to_json(config_url, port)
-        if "error" in config:
-            return {"config": config_url, "status": "error", "message": config["error"]}
-
-        # Save temporary config file
-        temp_filename = f"config_{port}.json"
-        with open(temp_filename, 'w') as f:
-            json.dump(config, f, indent=2)
-
-        # Start Xray process
-        process = subprocess.Popen(
-            ["./xray", "run", "-c", temp_filename],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
+        ipaddress.ip_address(text)
+        return True
+    except ValueError:
+        return False
+
+async def _wait_ready(port: int, process: asyncio.subprocess.Process, timeout: float = 3) -> bool:
+    """Wait until process accepts TCP connections on localhost:port, giving up if it exits"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        # Xray exits straight away on configs it rejects
+        if process.returncode is not None:
+            return False
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), 0.1)
+            writer.close()
+            return True
+        except (OSError, asyncio.TimeoutError):
+            await asyncio.sleep(0.05)
+    return False
+
+# Keep Xray config files in RAM where tmpfs is available, else the default temp dir
+XRAY_CONFIG_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+class XrayWorker:
+    """Runs one Xray process serving several configs, one SOCKS port each"""
+
+    def __init__(self, ports: List[int]):
+        self.ports = ports
+        self.config_file = None
+        self.process = None
+
+    async def start(self, ports: List[int], xray_config: bytes) -> bool:
+        """Start Xray with a serialized config, returning True once all ports are listening"""
+        await self.stop()
+        with tempfile.NamedTemporaryFile("wb", prefix=f"xray_{self.ports[0]}_", suffix=".json",
+                                         dir=XRAY_CONFIG_DIR, delete=False) as f:
+            f.write(xray_config)
+        self.config_file = f.name
+        self.process = await asyncio.create_subprocess_exec(
+            "./xray", "run", "-c", self.config_file,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
         )
+        ready = await asyncio.gather(*(_wait_ready(port, self.process) for port in ports))
+        return all(ready)
 
-        # Wait for Xray to start
-        await asyncio.sleep(2)
+    async def stop(self):
+        """Kill the running Xray process, if any, reap it and remove its config file"""
+        if self.process and self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+        self.process = None
+        if self.config_file:
+            try:
+                os.unlink(self.config_file)
+            except OSError:
+                pass
+            self.config_file = None
 
-        # Test connection using curl
+async def test_config(config_url: str, port: int, existing: Set[str], save_file: TextIO) -> Dict:
+    """Test a single config through the Xray SOCKS port serving it"""
+    # Test connection through the Xray SOCKS proxy, resolving DNS on the proxy side
+    try:
+        connector = ProxyConnector.from_url(f"socks5://127.0.0.1:{port}", rdns=True)
         try:
-            process_curl = await asyncio.create_subprocess_exec(
-                "curl", "-s", "-x", f"socks5h://localhost:{port}", 
-                "--connect-timeout", "10",
-                "ipconfig.io",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            try:
-                stdout, stderr = await asyncio.wait_for(process_curl.communicate(), timeout=15)
-                if stdout:
-                    output = stdout.decode().strip()
-                    # Check if output contains HTML tags
-                    if "<html" in output.lower() or "<!doctype" in output.lower():
-                        return {
-                            "config": config_url,
-                            "status": "failed",
-                            "message": "Received HTML response instead of IP",
-                            "port": port
-                        }
-                    try:
-                        ipaddress.ip_address(output)
-                    except ValueError:
-                        return {
-                            "config": config_url,
-                            "status": "failed",
-                            "message": f"Invalid IP: {output}",
-                            "port": port
-                        }
-                        
-                    # Before saving, check if it already exists
-                    if os.path.exists("working_configs.txt"):
-                        with open("working_configs.txt", "r") as f:
-                            if config_url in set(line.strip() for line in f):
-                                print(f"\033[93m[SKIP]\033[0m Config already exists")
-                                return {
-                                    "config": config_url,
-                                    "status": "success",
-                                    "ip": output,
-                                    "port": port,
-                                    "already_exists": True
-                                }
-                    
-                    # If we got here, save the new working config
-                    save_working_config(config_url)
+            timeout = aiohttp.ClientTimeout(total=15, connect=10)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                # ipconfig.io only answers with a bare IP for CLI user agents
+                async with session.get("http://ipconfig.io", headers={"User-Agent": "curl/8.0"}) as response:
+                    output = (await response.text()).strip()
+            if output:
+                # Check if output contains HTML tags
+                if "<html" in output.lower() or "<!doctype" in output.lower():
                     return {
                         "config": config_url,
-                        "status": "success",
-                        "ip": output,
-                        "port": port,
-                        "already_exists": False
+                        "status": "failed",
+                        "message": "Received HTML response instead of IP",
+                        "port": port
                     }
-                else:
+                if not _is_ip(output):
                     return {
                         "config": config_url,
                         "status": "failed",
-                        "message": "No response from IP check service",
+                        "message": f"Invalid IP: {output}",
                         "port": port
                     }
-            except asyncio.TimeoutError:
+                    
+                # Before saving, check if it already exists
+                if config_url in existing:
+                    print(f"\033[93m[SKIP]\033[0m Config already exists")
+                    return {
+                        "config": config_url,
+                        "status": "success",
+                        "ip": output,
+                        "port": port,
+                        "already_exists": True
+                    }
+                
+                # If we got here, save the new working config
+                save_working_config(config_url, existing, save_file)
+                return {
+                    "config": config_url,
+                    "status": "success",
+                    "ip": output,
+                    "port": port,
+                    "already_exists": False
+                }
+            else:
                 return {
                     "config": config_url,
                     "status": "failed",
-                    "message": "Connection timeout",
+                    "message": "No response from IP check service",
                     "port": port
                 }
-
-        except Exception as e:
+        except (asyncio.TimeoutError, ProxyTimeoutError):
             return {
                 "config": config_url,
-                "status": "error",
-                "message": str(e),
+                "status": "failed",
+                "message": "Connection timeout",
                 "port": port
             }
+        except (aiohttp.ClientError, ProxyError, ProxyConnectionError) as e:
+            return {
+                "config": config_url,
+                "status": "failed",
+                "message": f"Connection failed: {str(e)}",
+                "port": port
+            }
+
+    except Exception as e:
+        return {
+            "config": config_url,
+            "status": "error",
+            "message": str(e),
+            "port": port
+        }
 
+async def _test_on_xray(pending: List[Tuple[str, int, Tuple[bytes, bytes, bytes]]], worker: XrayWorker,
+                        existing: Set[str], save_file: TextIO) -> List[Dict]:
+    """Run pending configs on one Xray process and test each, splitting the group if Xray rejects it"""
+    try:
+        ports = [port for _, port, _ in pending]
+        if await worker.start(ports, merge_xray_slots([slot for _, _, slot in pending])):
+            return list(await asyncio.gather(*(
+                test_config(config_url, port, existing, save_file)
+                for config_url, port, _ in pending
+            )))
     finally:
-        # Cleanup
-        if process:
-            process.kill()
-        if process_curl:
-            try:
-                process_curl.kill()
-            except:
-                pass
-        if temp_filename and os.path.exists(temp_filename):
-            try:
-                os.remove(temp_filename)
-            except:
-                pass
+        await worker.stop()
 
-async def test_config_batch(configs: List[str], start_port: int = 1080, batch_size: int = 40):
-    """Test a batch of configs simultaneously"""
-    tasks = []
-    for i, config in enumerate(configs):
-        # Use modulo to cycle through the port range
-        port = start_port + (i % batch_size)
-        task = asyncio.create_task(test_config(config, port))
-        tasks.append(task)
-    
-    results = await asyncio.gather(*tasks)
+    # One config Xray refuses takes the whole process down, so bisect to find it
+    if len(pending) == 1:
+        config_url, port, _ = pending[0]
+        return [{
+            "config": config_url,
+            "status": "failed",
+            "message": "Xray did not start listening",
+            "port": port
+        }]
+    mid = len(pending) // 2
+    return (await _test_on_xray(pending[:mid], worker, existing, save_file)
+            + await _test_on_xray(pending[mid:], worker, existing, save_file))
+
+async def test_config_group(config_urls: List[str], worker: XrayWorker, existing: Set[str], save_file: TextIO) -> List[Dict]:
+    """Test up to len(worker.ports) configs on a single Xray process"""
+    results = []
+    pending = []
+    for config_url in config_urls:
+        port = worker.ports[len(pending)]
+        
+        # Convert config to Xray JSON format
+        try:
+            config = config_to_json(config_url, port)
+        except Exception as e:
+            config = {"error": str(e)}
+        if "error" in config:
+            results.append({"config": config_url, "status": "error", "message": config["error"]})
+            continue
+
+        # Already known to work - don't spend an Xray slot on it
+        if config_url in existing:
+            results.append({"config": config_url, "status": "success", "port": port, "already_exists": True})
+            continue
+
+        # Serialize here so a value orjson can't encode (e.g. a >64-bit int) only fails this config
+        try:
+            slot = xray_slot(config)
+        except orjson.JSONEncodeError as e:
+            results.append({"config": config_url, "status": "error", "message": str(e)})
+            continue
+
+        pending.append((config_url, port, slot))
+
+    if pending:
+        results.extend(await _test_on_xray(pending, worker, existing, save_file))
     return results
 
+async def test_config_batch(configs: List[str], existing: Set[str], save_file: TextIO,
+                            start_port: int = 1080, batch_size: int = 40, group_size: int = 1):
+    """Test configs on a pool of Xray processes serving group_size configs each, yielding results as they finish
+
+    With group_size > 1 a worker is only freed once every config in its group is done, so each
+    group waits on its slowest (usually timed-out) config in exchange for fewer Xray launches.
+    """
+    worker_count = max(1, batch_size // group_size)
+    workers = [
+        XrayWorker(list(range(start_port + i * group_size, start_port + (i + 1) * group_size)))
+        for i in range(worker_count)
+    ]
+    sem = asyncio.Semaphore(worker_count)
+    worker_pool = asyncio.Queue()
+    for worker in workers:
+        worker_pool.put_nowait(worker)
+
+    async def _bounded(group: List[str]) -> List[Dict]:
+        async with sem:
+            worker = await worker_pool.get()
+            try:
+                return await test_config_group(group, worker, existing, save_file)
+            finally:
+                worker_pool.put_nowait(worker)
+
+    groups = [configs[i:i + group_size] for i in range(0, len(configs), group_size)]
+    tasks = [asyncio.create_task(_bounded(group)) for group in groups]
+    try:
+        for task in asyncio.as_completed(tasks):
+            for result in await task:
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for worker in workers:
+            await worker.stop()
+
 def print_results(results: List[Dict], batch_num: int, total_batches: int):
     """Print test results with formatting"""
     print(f"\nResults for batch {batch_num}/{total_batches}:")
@@ -510,7 +686,8 @@ def print_results(results: List[Dict], batch_num: int, total_batches: int):
             if result.get("already_exists", False):
                 status_str += " (Already Exists)"
             print(f"\n{status_str} - Port: {result['port']}")
-            print(f"IP: {result['ip']}")
+            if "ip" in result:
+                print(f"IP: {result['ip']}")
             print(f"Config: {result['config']}")
         else:
             print(f"\n\033[91m[FAILED]\033[0m - Port: {result.get('port', 'N/A')}")
@@ -522,7 +699,7 @@ def read_configs_from_file(file_path: str) -> List[str]:
     """Read configs from a file where each line is a config"""
     try:
         with open(file_path, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
+            return [line for line in map(str.strip, f.read().splitlines()) if line]
     except Exception as e:
         print(f"Error reading file: {str(e)}")
         return []
@@ -539,6 +716,9 @@ async def main():
                       help='Starting port number (default: 1080)')
     parser.add_argument('-batch', type=int, default=40, 
                       help='Batch size for testing configs (default: 40)')
+    parser.add_argument('-group', type=int, default=1, 
+                      help='Configs served by each Xray process (default: 1). Higher values launch '
+                           'fewer Xray processes, but each group waits for its slowest config')
     
     args = parser.parse_args()
     
@@ -549,7 +729,8 @@ async def main():
             # Handle subscription link or single config
             if args.config.startswith("http"):
                 print("Fetching subscription configs...")
-                configs = fetch_subscription(args.config)
+                async with aiohttp.ClientSession() as session:
+                    configs = [config async for config in fetch_subscription(args.config, session)]
                 print(f"Found {len(configs)} configs")
             else:
                 configs = [args.config]
@@ -566,36 +747,38 @@ async def main():
         # Use command line arguments for batch_size and start_port
         batch_size = args.batch
         start_port = args.port
+        group_size = max(1, min(args.group, batch_size))
         
         print(f"\nUsing settings:")
         print(f"Starting port: {start_port}")
         print(f"Batch size: {batch_size}")
+        print(f"Configs per Xray process: {group_size}")
         
-        total_batches = (len(configs) + batch_size - 1) // batch_size
-        all_results = []
+        existing = load_working_configs()
+        save_file = open("working_configs.txt", "a", buffering=1)
+        try:
+            total_batches = (len(configs) + batch_size - 1) // batch_size
+            all_results = []
+            batch_results = []
 
-        for batch_num in range(total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = min(start_idx + batch_size, len(configs))
-            current_batch = configs[start_idx:end_idx]
-            
-            print(f"\nTesting batch {batch_num + 1}/{total_batches} ({len(current_batch)} configs)")
-            
-            results = await test_config_batch(
-                current_batch,
-                start_port,
-                batch_size
-            )
-            
-            print_results(results, batch_num + 1, total_batches)
-            all_results.extend(results)
+            print(f"\nTesting {len(configs)} configs ({batch_size} at a time)")
 
-        # Print final summary
-        total_working = sum(1 for r in all_results if r["status"] == "success")
-        print(f"\nFinal Summary:")
-        print(f"Total configs tested: {len(all_results)}")
-        print(f"Working configs: {total_working}")
-        print(f"Success rate: {(total_working/len(all_results)*100):.1f}%")
+            # Results arrive as soon as each test finishes; report them in groups of batch_size
+            async for result in test_config_batch(configs, existing, save_file, start_port, batch_size, group_size):
+                batch_results.append(result)
+                if len(batch_results) == batch_size or len(all_results) + len(batch_results) == len(configs):
+                    all_results.extend(batch_results)
+                    print_results(batch_results, (len(all_results) + batch_size - 1) // batch_size, total_batches)
+                    batch_results = []
+
+            # Print final summary
+            total_working = sum(1 for r in all_results if r["status"] == "success")
+            print(f"\nFinal Summary:")
+            print(f"Total configs tested: {len(all_results)}")
+            print(f"Working configs: {total_working}")
+            print(f"Success rate: {(total_working/len(all_results)*100):.1f}%")
+        finally:
+            save_file.close()
 
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
@@ -603,4 +786,13 @@ async def main():
         print(f"\nUnexpected error: {str(e)}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop speeds up the subprocess/socket heavy event loop where it's available
+    if uvloop is not None and sys.platform != "win32":
+        if sys.version_info >= (3, 11):
+            with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+                runner.run(main())
+        else:
+            uvloop.install()
+            asyncio.run(main())
+    else:
+        asyncio.run(main())